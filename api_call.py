@@ -1,17 +1,20 @@
 import os
-import requests
+import httpx
+import asyncio
 import logging
 import time
+import threading
+import random
+import math
+from collections import deque, OrderedDict
 from bs4 import BeautifulSoup
 import urllib
-from transformers import pipeline
-from huggingface_hub import login
-import tensorflow as tf
+from email.utils import parsedate_to_datetime
+from diskcache import Cache
 import warnings
 import re
 
-# Disable TensorFlow warnings
-tf.get_logger().setLevel('ERROR')
+# Suppress specific warnings
 warnings.filterwarnings("ignore", message="Examining the path of torch.classes raised")
 
 # Configure logging
@@ -27,68 +30,500 @@ if not API_KEY_SCRAPER:
 if not api_token:
     raise ValueError("Hugging Face API token not found. Set the 'HUGGING_FACE_API_TOKEN' environment variable.")
 
-# Login to Hugging Face
-try:
-    login(token=api_token)
-except Exception as e:
-    logging.error(f"Error during Hugging Face login: {e}")
+class Concurrency:
+    """
+    AIMD (additive-increase, multiplicative-decrease) limit on concurrent requests,
+    shared by all searches in the process.
+
+    Args:
+    - c (float): Initial concurrency limit.
+    - cmin (int): Lower bound of the limit.
+    - cmax (int): Upper bound of the limit.
+    - alpha (float): Amount added to the limit after each successful request.
+    - beta (float): Factor the limit is multiplied by after an error.
+    - latency_target (float): Successful requests slower than this (in seconds) raise the limit
+      by a proportionally smaller amount.
+    """
+
+    def __init__(self, c=8, cmin=1, cmax=16, alpha=0.5, beta=0.5, latency_target=5.0):
+        self.c = c
+        self.cmin = cmin
+        self.cmax = cmax
+        self.alpha = alpha
+        self.beta = beta
+        self.latency_target = latency_target
+        self._active = 0
+        self._lock = threading.Lock()
+        # (event loop, future) pairs of async callers waiting for a slot, in arrival order
+        self._waiters = deque()
+
+    async def acquire_async(self):
+        """
+        Waits without blocking the event loop until a slot is free. Waiters are served in
+        arrival order, and a cancelled wait never leaves a slot held.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._active < int(self.c):
+                self._active += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+            # A slot handed over before the cancellation must be given back. If the future was
+            # cancelled first, _hand_over gives it back instead.
+            if granted and not future.cancelled():
+                self.release()
+            raise
+
+    def _grant_waiters(self):
+        # Called with the lock held: hand free slots to async waiters on their own event loops
+        while self._waiters and self._active < int(self.c):
+            loop, future = self._waiters.popleft()
+            self._active += 1
+            try:
+                loop.call_soon_threadsafe(self._hand_over, future)
+            except RuntimeError:  # The waiter's event loop is already closed
+                self._active -= 1
+
+    def _hand_over(self, future):
+        if future.done():  # The wait was cancelled
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+            self._grant_waiters()
+
+    def on_success(self, latency):
+        with self._lock:
+            # Always recover after errors; slow responses only scale the increase down
+            self.c = min(self.cmax, self.c + self.alpha * min(1.0, self.latency_target / max(latency, 1e-9)))
+            self._grant_waiters()
+
+    def on_error(self):
+        with self._lock:
+            self.c = max(self.cmin, self.c * self.beta)
+            logging.info(f"Reduced ScraperAPI concurrency limit to {int(self.c)}.")
+
+# Adaptive cap on concurrent ScraperAPI requests across all searches.
+# Google searches through ScraperAPI typically take a few seconds.
+SCRAPER_LATENCY_TARGET = float(os.getenv("SCRAPER_LATENCY_TARGET", "5.0"))
+scraper_concurrency = Concurrency(latency_target=SCRAPER_LATENCY_TARGET)
+
+# Sliding-window limit on ScraperAPI requests per minute
+_RPM_LIMIT = 60
+_RPM_WINDOW = 60  # seconds
+_rpm = deque()
+_rpm_lock = threading.Lock()
+
+# Time (time.monotonic) before which no worker may send a request, set from rate-limit headers
+_resume_at = 0.0
+_resume_lock = threading.Lock()
+
+# Longest pause taken from rate-limit headers; the pause applies to every session in the process
+MAX_RATE_LIMIT_PAUSE = 60  # seconds
+
+def pause_requests(seconds):
+    """
+    Stops all workers from sending requests for the given number of seconds.
+
+    Args:
+    - seconds (float): How long to pause, at most MAX_RATE_LIMIT_PAUSE.
+    """
+    global _resume_at
+    seconds = min(MAX_RATE_LIMIT_PAUSE, seconds)
+    with _resume_lock:
+        _resume_at = max(_resume_at, time.monotonic() + seconds)
+    logging.info(f"Pausing ScraperAPI requests for {seconds:.1f} seconds as requested by rate-limit headers.")
+
+def wait_if_throttled():
+    """
+    Blocks until any pause requested by the server has passed and another request fits
+    in the sliding one-minute window, then records it.
+    Prevents bursts when many searches start at once.
+    """
+    while True:
+        with _resume_lock:
+            wait_time = _resume_at - time.monotonic()
+        if wait_time <= 0:
+            break
+        time.sleep(wait_time)
+
+    with _rpm_lock:
+        now = time.monotonic()
+        while _rpm and _rpm[0] <= now - _RPM_WINDOW:
+            _rpm.popleft()
+        if len(_rpm) >= _RPM_LIMIT:
+            wait_time = _rpm[0] + _RPM_WINDOW - now
+            logging.info(f"Request rate limit reached. Waiting {wait_time:.1f} seconds.")
+            time.sleep(wait_time)
+            _rpm.popleft()
+        _rpm.append(time.monotonic())
+
+# Pause when less than this fraction of the rate-limit quota remains
+RATE_LIMIT_REMAINING_THRESHOLD = 0.1
+
+# Last time (time.monotonic) a low quota lowered the concurrency limit
+_last_quota_decrease = float("-inf")
+
+def clamp_pause(seconds, header):
+    """
+    Bounds a wait taken from a response header.
+
+    Args:
+    - seconds (float): The wait read from the header.
+    - header (str): Name of the header, for logging.
+
+    Returns:
+    - float or None: The wait limited to MAX_RATE_LIMIT_PAUSE, or None if it is not a finite number.
+    """
+    if not math.isfinite(seconds):
+        logging.warning(f"Ignoring non-finite {header} header: {seconds}")
+        return None
+    return min(MAX_RATE_LIMIT_PAUSE, max(0.0, seconds))
+
+def get_retry_after(response):
+    """
+    Reads the Retry-After header of a response.
+
+    Args:
+    - response (httpx.Response): The response to inspect.
+
+    Returns:
+    - float or None: Seconds to wait, at most MAX_RATE_LIMIT_PAUSE, or None if the header is missing or invalid.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return clamp_pause(float(retry_after), "Retry-After")
+    except ValueError:
+        pass
+    try:
+        return clamp_pause(parsedate_to_datetime(retry_after).timestamp() - time.time(), "Retry-After")
+    except (TypeError, ValueError):
+        logging.warning(f"Ignoring invalid Retry-After header: {retry_after}")
+        return None
+
+def get_ratelimit_reset(response):
+    """
+    Reads the x-ratelimit-reset header, given either in seconds or as a Unix timestamp.
+
+    Args:
+    - response (httpx.Response): The response to inspect.
+
+    Returns:
+    - float or None: Seconds until the quota resets, at most MAX_RATE_LIMIT_PAUSE, or None if the header is missing or invalid.
+    """
+    reset = response.headers.get("x-ratelimit-reset")
+    if reset is None:
+        return None
+    try:
+        reset = float(reset)
+    except ValueError:
+        return None
+    if reset > 1e9:  # Unix timestamp
+        reset -= time.time()
+    return clamp_pause(reset, "x-ratelimit-reset")
+
+def rate_limit_pause(response):
+    """
+    Applies the rate-limit headers of a successful response to all workers. A Retry-After
+    header pauses every worker; a low remaining quota lowers the concurrency limit (at most
+    once per minute) and pauses until the quota resets when the server says when that is.
+
+    Args:
+    - response (httpx.Response): The response to inspect.
+    """
+    retry_after = get_retry_after(response)
+    if retry_after is not None:
+        pause_requests(retry_after)
+        return
+    remaining = response.headers.get("x-ratelimit-remaining")
+    limit = response.headers.get("x-ratelimit-limit")
+    try:
+        quota_low = remaining is not None and limit is not None and float(remaining) / float(limit) < RATE_LIMIT_REMAINING_THRESHOLD
+    except (ValueError, ZeroDivisionError):
+        quota_low = False
+    if quota_low:
+        global _last_quota_decrease
+        logging.info(f"ScraperAPI rate-limit quota is low ({remaining}/{limit} remaining).")
+        with _resume_lock:
+            now = time.monotonic()
+            decrease = now - _last_quota_decrease >= _RPM_WINDOW
+            if decrease:
+                _last_quota_decrease = now
+        # Lower the limit at most once per window so a low quota does not ratchet it to the minimum
+        if decrease:
+            scraper_concurrency.on_error()
+        reset = get_ratelimit_reset(response)
+        if reset:
+            pause_requests(reset)
+
+# Persistent cache of search results keyed on (entity, custom_prompt)
+search_cache = Cache(".cache/scraper")
+SEARCH_CACHE_TTL = 7 * 24 * 60 * 60  # seconds, contact details change over time
+
+def store_search_results(cache_key, results):
+    # Empty results usually mean a CAPTCHA or consent page, so they are searched again next time
+    if results:
+        search_cache.set(cache_key, results, expire=SEARCH_CACHE_TTL)
+
+def build_search_url(entity, custom_prompt):
+    query = custom_prompt.format(entity=entity)
+    encoded_query = urllib.parse.quote(query)
+    return f"https://api.scraperapi.com?api_key={API_KEY_SCRAPER}&url=https://www.google.com/search?q={encoded_query}"
+
+def parse_search_results(html, entity):
+    """
+    Extracts the first 5 Google results whose snippet mentions an email.
+
+    Args:
+    - html (str): The search results page.
+    - entity (str): The entity the search was made for.
+
+    Returns:
+    - list: Search results with 'entity', 'title', 'link' and 'snippet' fields.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    results = []
+    for result in soup.select(".g", limit=5):  # Limit to the first 5 results
+        title_tag = result.select_one("h3")
+        link_tag = result.select_one("a")
+        snippet_tag = result.select_one(".VwiC3b")
+        title = title_tag.get_text() if title_tag else "No title available"
+        link = link_tag["href"] if link_tag else "No link available"
+        snippet = snippet_tag.get_text() if snippet_tag else "No snippet available"
+        if "email" in snippet.lower():
+            results.append({
+                "entity": entity,
+                "title": title,
+                "link": link,
+                "snippet": snippet
+            })
+    return results
+
+def get_backoff_time(retries, response=None, base_backoff_time=1):
+    """
+    Computes the wait before retrying a failed request: capped exponential backoff with jitter,
+    or the server's Retry-After on a 429 response, which also pauses all other workers.
+
+    Args:
+    - retries (int): Number of attempts that already failed.
+    - response (httpx.Response): The failed response, if any.
+    - base_backoff_time (float): Initial backoff time in seconds.
+
+    Returns:
+    - float: Seconds to wait.
+    """
+    if response is not None and response.status_code == 429:
+        # Wait as long as the server asks instead of guessing
+        retry_after = get_retry_after(response)
+        if retry_after is not None:
+            pause_requests(retry_after)
+            return retry_after
+    return min(30, base_backoff_time * 2 ** retries * (1 + random.random() * 0.5))
 
 # Function to perform web search with exponential backoff and filtering for email presence
-def search_query(entity, custom_prompt, max_retries=5):
+async def search_query_async(entity, custom_prompt, client, max_retries=5, refresh=False):
     """
-    Perform a web search for a given entity using ScraperAPI, with exponential backoff for rate limiting
-    and marking results where emails are not found.
+    Perform a web search for a given entity using ScraperAPI through a shared httpx.AsyncClient,
+    with exponential backoff for rate limiting and marking results where emails are not found.
+    Successful results are cached on disk.
 
     Args:
     - entity (str): The entity to search for.
     - custom_prompt (str): Custom search prompt.
+    - client (httpx.AsyncClient): Client used to send the request.
     - max_retries (int): Maximum number of retries for rate limiting.
+    - refresh (bool): Skip the cached results and search again.
 
     Returns:
     - list: Search results with entries where emails were not found marked accordingly.
     """
-    query = custom_prompt.format(entity=entity)
-    encoded_query = urllib.parse.quote(query)
-    search_url = f"http://api.scraperapi.com?api_key={API_KEY_SCRAPER}&url=https://www.google.com/search?q={encoded_query}"
-    headers = {"User-Agent": "Mozilla/5.0"}
+    cache_key = (str(entity), custom_prompt)
+    if not refresh:
+        cached_results = search_cache.get(cache_key)
+        if cached_results is not None:
+            logging.info(f"Using cached search results for entity '{entity}'.")
+            return cached_results
 
+    search_url = build_search_url(entity, custom_prompt)
     retries = 0
-    backoff_time = 1  # Initial backoff time in seconds
 
     while retries < max_retries:
         try:
-            response = requests.get(search_url, headers=headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            results = []
-            for i, result in enumerate(soup.select(".g")):
-                if i >= 5:  # Limit to the first 5 results
-                    break
-                title = result.select_one("h3").get_text() if result.select_one("h3") else "No title available"
-                link = result.select_one("a")["href"] if result.select_one("a") else "No link available"
-                snippet = result.select_one(".VwiC3b").get_text() if result.select_one(".VwiC3b") else "No snippet available"
-                if "email" in snippet.lower():
-                    results.append({
-                        "entity": entity,
-                        "title": title,
-                        "link": link,
-                        "snippet": snippet
-                    })
+            await scraper_concurrency.acquire_async()
+            try:
+                # The throttle blocks, so wait on it in a worker thread
+                await asyncio.to_thread(wait_if_throttled)
+                start_time = time.monotonic()
+                response = await client.get(search_url)
+                response.raise_for_status()
+            finally:
+                scraper_concurrency.release()
+            scraper_concurrency.on_success(time.monotonic() - start_time)
+            rate_limit_pause(response)
+            results = parse_search_results(response.text, entity)
+            store_search_results(cache_key, results)
             return results
-        
-        except requests.exceptions.RequestException as e:
-            # Handle rate limiting or connection errors with exponential backoff
-            logging.warning(f"Request error for entity '{entity}': {e}. Retrying in {backoff_time} seconds.")
-            time.sleep(backoff_time)
+
+        except httpx.HTTPError as e:
+            # Handle rate limiting or connection errors by lowering concurrency and backing off with jitter
+            scraper_concurrency.on_error()
+            backoff_time = get_backoff_time(retries, e.response if isinstance(e, httpx.HTTPStatusError) else None)
+            logging.warning(f"Request error for entity '{entity}': {e}. Retrying in {backoff_time:.1f} seconds.")
+            await asyncio.sleep(backoff_time)
             retries += 1
-            backoff_time *= 2  # Exponential backoff
-        
+
     # If all retries are exhausted, log an error and return an empty list
     logging.error(f"Max retries reached for entity '{entity}'. No results retrieved.")
     return []
 
-# Load the QA model from Hugging Face
-generator = pipeline("question-answering", model="deepset/roberta-base-squad2", tokenizer="deepset/roberta-base-squad2")
+async def _search_queries_async(entity_queries, refresh, max_retries):
+    async with httpx.AsyncClient(
+        http2=True,
+        headers={"User-Agent": "Mozilla/5.0"},
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=30
+    ) as client:
+        return await asyncio.gather(
+            *(search_query_async(entity, query, client, max_retries=max_retries, refresh=refresh) for entity, query in entity_queries),
+            return_exceptions=True
+        )
+
+def search_queries(entity_queries, refresh=False, max_retries=5):
+    """
+    Runs the web searches for several entities concurrently on one HTTP/2 connection pool.
+
+    Args:
+    - entity_queries (list of tuple): (entity, custom_prompt) pairs to search for.
+    - refresh (bool): Skip the cached results and search again.
+    - max_retries (int): Maximum number of retries for rate limiting.
+
+    Returns:
+    - list: The search results for each pair in order, or the exception raised for it.
+    """
+    return asyncio.run(_search_queries_async(entity_queries, refresh, max_retries))
+
+def search_query(entity, custom_prompt, max_retries=5, refresh=False):
+    """
+    Synchronous wrapper around search_query_async for a single entity.
+
+    Args:
+    - entity (str): The entity to search for.
+    - custom_prompt (str): Custom search prompt.
+    - max_retries (int): Maximum number of retries for rate limiting.
+    - refresh (bool): Skip the cached results and search again.
+
+    Returns:
+    - list: Search results with entries where emails were not found marked accordingly.
+    """
+    results = search_queries([(entity, custom_prompt)], refresh=refresh, max_retries=max_retries)[0]
+    if isinstance(results, BaseException):
+        raise results
+    return results
+
+QA_MODEL_NAME = "deepset/roberta-base-squad2"
+QA_MAX_SEQ_LEN = 512  # Fixed input length on GPU
+
+def load_qa_model():
+    """
+    Loads the QA model in reduced precision: FP16 and compiled on a GPU, dynamically quantized int8 on CPU.
+
+    Returns:
+    - tuple: The model and the device index to run the pipeline on.
+    """
+    import torch
+    from transformers import AutoModelForQuestionAnswering
+
+    model = AutoModelForQuestionAnswering.from_pretrained(QA_MODEL_NAME)
+    model.eval()
+    if torch.cuda.is_available():
+        model = model.half().to("cuda")
+        # Compile the forward pass into CUDA graphs, inputs are padded to a fixed length below
+        model.forward = torch.compile(model.forward, mode="reduce-overhead")
+        # Compilation is lazy, so run one forward pass now and fall back to eager mode if it fails
+        try:
+            with torch.inference_mode():
+                warmup_ids = torch.zeros((1, QA_MAX_SEQ_LEN), dtype=torch.long, device="cuda")
+                model(input_ids=warmup_ids, attention_mask=torch.ones_like(warmup_ids))
+        except Exception as e:
+            logging.warning(f"torch.compile failed, using the uncompiled model: {e}")
+            del model.forward
+        return model, 0
+    # Quantize the linear layers' weights to int8, activations are quantized on the fly
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), -1
+
+_generator = None
+_generator_kwargs = {}
+_generator_lock = threading.Lock()
+
+def get_generator():
+    """
+    Logs in to Hugging Face and loads the QA pipeline on first use, so the heavy
+    torch/transformers imports do not slow down app startup.
+
+    Returns:
+    - tuple: The QA pipeline and the keyword arguments to call it with.
+    """
+    global _generator, _generator_kwargs
+    with _generator_lock:
+        if _generator is None:
+            from huggingface_hub import login
+            from transformers import AutoTokenizer, pipeline
+
+            # Login to Hugging Face
+            try:
+                login(token=api_token)
+            except Exception as e:
+                logging.error(f"Error during Hugging Face login: {e}")
+
+            # Load the QA model from Hugging Face
+            qa_model, qa_device = load_qa_model()
+            _generator = pipeline("question-answering", model=qa_model, tokenizer=AutoTokenizer.from_pretrained(QA_MODEL_NAME), device=qa_device)
+
+            # Pad every input to the same length on GPU so the compiled graph is reused across calls
+            _generator_kwargs = {"padding": "max_length", "max_seq_len": QA_MAX_SEQ_LEN} if qa_device == 0 else {}
+    return _generator, _generator_kwargs
+
+# LRU cache of QA answers keyed on (prompt, context), shared by the single and batched paths
+_QA_CACHE_SIZE = 4096
+_qa_cache = OrderedDict()
+_qa_cache_lock = threading.Lock()
+
+def get_cached_answer(prompt, context):
+    with _qa_cache_lock:
+        key = (prompt, context)
+        if key not in _qa_cache:
+            return None
+        _qa_cache.move_to_end(key)
+        return _qa_cache[key]
+
+def store_answer(prompt, context, answer):
+    with _qa_cache_lock:
+        _qa_cache[(prompt, context)] = answer
+        _qa_cache.move_to_end((prompt, context))
+        while len(_qa_cache) > _QA_CACHE_SIZE:
+            _qa_cache.popitem(last=False)
+
+def _cached_qa(prompt, context):
+    answer = get_cached_answer(prompt, context)
+    if answer is None:
+        generator, generator_kwargs = get_generator()
+        answer = generator(question=prompt, context=context, **generator_kwargs)['answer']
+        store_answer(prompt, context, answer)
+    return answer
 
 def call_llm_with_huggingface(prompt, context):
     """
@@ -102,19 +537,85 @@ def call_llm_with_huggingface(prompt, context):
     Returns:
     - str: Extracted answer from the context based on the prompt or an error message if extraction fails.
     """
-    logging.debug(f"Calling LLM with prompt: {prompt}")
-    logging.debug(f"Context provided to LLM: {context}")
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(f"Calling LLM with prompt: {prompt}")
+        logging.debug(f"Context provided to LLM: {context}")
 
     try:
-        # Perform question-answering
-        results = generator(question=prompt, context=context)
-        answer = results['answer']  # Extract the answer directly
+        # Perform question-answering, reusing answers for repeated prompt/context pairs
+        answer = _cached_qa(prompt, context)
         logging.info(f"LLM extracted answer: {answer}")
         return answer
     except Exception as e:
         logging.error(f"Error during Hugging Face model call: {e}", exc_info=True)
         return "Failed to get a response from the Hugging Face model."
 
+# Base prompt for email extraction
+BASE_PROMPT = "Extract the email address for the given Entity from the following search results if email not found then return the snippet:"
+
+# Regex used to find a valid email address in the LLM response, compiled once at import
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+def build_context(results):
+    """
+    Aggregates the snippets of the search results into a single context for the QA model.
+
+    Args:
+    - results (list of dict): Each dictionary contains 'entity', 'title', 'link', and 'snippet' fields.
+
+    Returns:
+    - str: The context passed to the QA model.
+    """
+    context = "".join(
+        f"Entity: {result['entity']}\nTitle: {result['title']}\nLink: {result['link']}\nSnippet: {result['snippet']}\n\n"
+        for result in results
+    )
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        for result in results:
+            logging.debug(f"Appended result for entity '{result['entity']}' to context.")
+    return context
+
+def find_email_in_snippets(results):
+    """
+    Looks for an email address directly in the search result snippets, so the QA model
+    only has to run when none of them contains one.
+
+    Args:
+    - results (list of dict): Each dictionary contains 'entity', 'title', 'link', and 'snippet' fields.
+
+    Returns:
+    - str or None: The first email found with the link and snippet it came from, or None.
+    """
+    for result in results:
+        match = EMAIL_RE.search(result['snippet'])
+        if match:
+            logging.info(f"Found email in snippet for entity '{result['entity']}': {match.group()}")
+            return match.group() + result['link'] + result['snippet']
+    return None
+
+def format_llm_response(response, matches, results, context):
+    """
+    Validates the LLM response and combines it with the last search result.
+
+    Args:
+    - response (str): Answer returned by the QA model.
+    - matches (list of str): Email addresses found in the response.
+    - results (list of dict): The search results the context was built from.
+    - context (str): The context passed to the QA model.
+
+    Returns:
+    - str: The extracted information.
+    """
+    result = results[-1]
+    if response and isinstance(response, str) and (matches or "@" in response):
+        email = matches[0]
+        logging.info(f"Extracted information: {response}")
+        return response + email + result['link'] + result['snippet']
+    else:
+        logging.warning(f"LLM returned an incomplete or invalid response for context: {context}")
+        logging.info(f"Extracted information: {response}")
+        return  response + result['link'] + result['snippet'] +"(Exact email not found because LLM may not have found relevant data to extract email.)"
+
 def parse_results_with_llm(results):
     """
     Parses a list of search results to extract information (e.g., email addresses) 
@@ -129,35 +630,82 @@ def parse_results_with_llm(results):
     if not results:
         logging.warning("No results to parse.")
         return "No results to parse."
-    
-    # Define a base prompt for email extraction
-    base_prompt = "Extract the email address for the given Entity from the following search results if email not found then return the snippet:"
+
+    # Skip the LLM when a snippet already contains an email
+    snippet_email = find_email_in_snippets(results)
+    if snippet_email is not None:
+        return snippet_email
 
     # Construct context by aggregating snippets for each entity
-    context = ""
-    for result in results:
-        context += f"Entity: {result['entity']}\nTitle: {result['title']}\nLink: {result['link']}\nSnippet: {result['snippet']}\n\n"
-        logging.debug(f"Appended result for entity '{result['entity']}' to context.")
+    context = build_context(results)
 
     # Attempt to extract information using the LLM
     try:
-        response = call_llm_with_huggingface(base_prompt, context)
-        
-        
-        # Use a regex pattern to find a valid email address
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        matches = re.findall(email_pattern, response)
-
-        # Validate response format and content
-        if response and isinstance(response, str) and (matches or "@" in response):
-            email = matches[0]
-            logging.info(f"Extracted information: {response}")
-            return response + email + result['link'] + result['snippet']
-        else:
-            logging.warning(f"LLM returned an incomplete or invalid response for context: {context}")
-            logging.info(f"Extracted information: {response}")
-            return  response + result['link'] + result['snippet'] +"(Exact email not found because LLM may not have found relevant data to extract email.)"
+        response = call_llm_with_huggingface(BASE_PROMPT, context)
+        matches = EMAIL_RE.findall(response)
+        return format_llm_response(response, matches, results, context)
     
     except Exception as e:
         logging.error("Error in parse_results_with_llm", exc_info=True)
         return "Error during parsing of results."
+
+def parse_results_batch(all_results, batch_size=16):
+    """
+    Parses the search results of several entities with a single batched pass
+    through the question-answering LLM.
+
+    Args:
+    - all_results (list of list of dict): Search results for each entity, as accepted by parse_results_with_llm.
+    - batch_size (int): Number of contexts per forward pass.
+
+    Returns:
+    - list of str: The extracted information for each entity, in the same order as all_results.
+    """
+    parsed = ["No results to parse."] * len(all_results)
+    contexts = {}
+    for i, results in enumerate(all_results):
+        if not results:
+            logging.warning("No results to parse.")
+            continue
+        # Skip the LLM when a snippet already contains an email
+        snippet_email = find_email_in_snippets(results)
+        if snippet_email is not None:
+            parsed[i] = snippet_email
+        else:
+            contexts[i] = build_context(results)
+    if not contexts:
+        return parsed
+
+    # Reuse cached answers and run each remaining distinct context through the model once
+    answers = {}
+    missing_contexts = []
+    for context in dict.fromkeys(contexts.values()):
+        answer = get_cached_answer(BASE_PROMPT, context)
+        if answer is None:
+            missing_contexts.append(context)
+        else:
+            answers[context] = answer
+    if missing_contexts:
+        inputs = [{"question": BASE_PROMPT, "context": context} for context in missing_contexts]
+        try:
+            generator, generator_kwargs = get_generator()
+            outputs = generator(inputs, batch_size=batch_size, **generator_kwargs)
+            if isinstance(outputs, dict):
+                outputs = [outputs]
+            for context, output in zip(missing_contexts, outputs):
+                answers[context] = output['answer']
+                store_answer(BASE_PROMPT, context, output['answer'])
+        except Exception as e:
+            logging.error(f"Error during Hugging Face model call: {e}", exc_info=True)
+            for context in missing_contexts:
+                answers[context] = "Failed to get a response from the Hugging Face model."
+
+    for i, context in contexts.items():
+        response = answers[context]
+        logging.info(f"LLM extracted answer: {response}")
+        try:
+            parsed[i] = format_llm_response(response, EMAIL_RE.findall(response), all_results[i], context)
+        except Exception:
+            logging.error("Error in parse_results_batch", exc_info=True)
+            parsed[i] = "Error during parsing of results."
+    return parsed
@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from api_call import parse_results_with_llm, search_query
+import numpy as np
+from api_call import parse_results_batch, search_queries
 from google.oauth2.service_account import Credentials
 import gspread
+from gspread.utils import absolute_range_name
 import logging
 import io
+import csv
 import warnings
 
 # Suppress specific warnings
@@ -28,20 +29,50 @@ if "data_source" not in st.session_state:
     st.session_state["data_source"] = None
 if "query_template" not in st.session_state:
     st.session_state["query_template"] = None  # Ensure query template is initialized
+if "sheet_url" not in st.session_state:
+    st.session_state["sheet_url"] = None
+
+# Function to convert a column of sheet values to numbers when every value is numeric
+def convert_numeric_column(column):
+    try:
+        return pd.to_numeric(column)
+    except (ValueError, TypeError):
+        return column
+
+# Function to authorize the Google Sheets client once and share it across reruns
+@st.cache_resource
+def get_gspread_client():
+    credentials = Credentials.from_service_account_info(st.secrets["gcp_service_account"])
+    return gspread.authorize(credentials)
+
+# Function to download a Google Sheet, cached so reruns with the same URL skip the download
+@st.cache_data(ttl=600)
+def fetch_google_sheet(sheet_url):
+    sheet = get_gspread_client().open_by_url(sheet_url)
+    worksheet = sheet.get_worksheet(0)  # First sheet
+    rows = worksheet.get_all_values()
+    if not rows:
+        return pd.DataFrame()
+    data = pd.DataFrame(rows[1:], columns=rows[0])
+    return data.apply(convert_numeric_column).convert_dtypes(dtype_backend="pyarrow")
 
 # Function to load data from Google Sheets
 def load_google_sheet(sheet_url):
     try:
-        credentials = Credentials.from_service_account_info(st.secrets["gcp_service_account"])
-        client = gspread.authorize(credentials)
-        sheet = client.open_by_url(sheet_url)
-        worksheet = sheet.get_worksheet(0)  # First sheet
-        data = pd.DataFrame(worksheet.get_all_records())
-        return data
+        return fetch_google_sheet(sheet_url)
     except Exception as e:
         st.error(f"Error loading Google Sheet: {e}")
         return None
 
+# Function to read a CSV into Arrow-backed columns, falling back to the default parser for files pyarrow rejects
+def read_csv(uploaded_file):
+    try:
+        return pd.read_csv(uploaded_file, engine="pyarrow", dtype_backend="pyarrow")
+    except ValueError as e:
+        logging.warning(f"pyarrow could not parse the CSV file, using the default parser: {e}")
+        uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file)
+
 # Function to upload CSV or Google Sheets data
 def upload_data():
     st.sidebar.title("Data Input")
@@ -51,7 +82,7 @@ def upload_data():
     if data_source == "Upload CSV":
         uploaded_file = st.sidebar.file_uploader("Upload your CSV file", type=["csv"])
         if uploaded_file:
-            data = pd.read_csv(uploaded_file)
+            data = read_csv(uploaded_file)
             st.session_state["data"] = data
             st.session_state["data_source"] = "CSV"  
             st.success("CSV file uploaded successfully!")
@@ -62,10 +93,22 @@ def upload_data():
             if data is not None:
                 st.session_state["data"] = data
                 st.session_state["data_source"] = "Google Sheets"  
+                st.session_state["sheet_url"] = sheet_url
                 st.success("Data loaded successfully from Google Sheets!")
     
     return st.session_state.get("data")
 
+# Function to substitute every unique, non-missing entity into the query template with vectorized
+# string operations; returns (entity, query) pairs so the preview and the search use the same text
+def build_entity_queries(query_template, entities):
+    entities = entities.dropna().drop_duplicates()
+    entity_text = entities.map(str)
+    parts = query_template.split("{entity}")
+    queries = pd.Series(parts[0], index=entities.index)
+    for part in parts[1:]:
+        queries = queries + entity_text + part
+    return list(zip(entities.tolist(), queries.tolist()))
+
 # Function for dynamic query input
 def dynamic_query_input(data):
     st.header("Dynamic Query Input with Custom Prompt")
@@ -81,10 +124,9 @@ def dynamic_query_input(data):
                                 "Get me the email address of {entity} company for contacting them")
 
         if primary_column and query_template:
-            generated_queries = [query_template.replace("{entity}", str(entity)) for entity in data[primary_column].unique()]
+            generated_queries = [query for _, query in build_entity_queries(query_template, data[primary_column])]
             st.write("Generated Queries:")
-            for query in generated_queries:
-                st.write(query)
+            st.text("\n".join(generated_queries))
             st.session_state["generated_queries"] = generated_queries
             st.session_state["query_template"] = query_template  # Store the custom prompt for later use
     else:
@@ -107,44 +149,45 @@ def automated_web_search_and_parse(filtered_data):
         return
 
     # Enable search and parsing if the checkbox and button are selected
+    refresh = st.checkbox("Refresh cached search results")
     if st.checkbox("Enable Automated Web Search and Parsing") and st.button("Run Automated Web Search and Parse"):
         results_storage = {}
         query_template = st.session_state.get("query_template", "Get me the email address of {entity}")
         
-        # Get unique entities from the selected column in the filtered data
-        unique_entities = filtered_data[entity_column].unique()
-        
-        for entity in unique_entities:
-            query = query_template.replace("{entity}", str(entity))
-            st.write(f"Searching for: {query}")
-            logging.info(f"Running search query for entity '{entity}' with query: '{query}'")
-            try:
-                # Perform the search query using the provided entity
-                search_results = search_query(entity, query)
-                
-                # Check if search results are valid and structured correctly
-                if isinstance(search_results, list) and all(isinstance(result, dict) for result in search_results):
-                    # Structure results for parsing
-                    structured_results = [
-                        {
-                            "entity": entity,
-                            "title": result.get("title", "N/A"),
-                            "link": result.get("link", "N/A"),
-                            "snippet": result.get("snippet", "N/A")
-                        }
-                        for result in search_results
-                    ]
-                    parsed_output = parse_results_with_llm(structured_results)
-                    results_storage[entity] = parsed_output
-                    
-                else:
-                    st.write(f"No valid results found for {entity}.")
-                    logging.warning(f"Unexpected search results format for entity '{entity}': {search_results}")
-
-            except Exception as e:
-                logging.error(f"Error for entity '{entity}': {e}")
-                st.error(f"Error for entity '{entity}': {e}")
-                continue
+        # Build the queries for the unique entities in the filtered data
+        entity_queries = build_entity_queries(query_template, filtered_data[entity_column])
+        st.write("Searching for:")
+        st.text("\n".join(query for _, query in entity_queries))
+        logging.info(f"Running search queries for {len(entity_queries)} entities.")
+
+        # Run all searches concurrently
+        collected_results = {}
+        for (entity, _), search_results in zip(entity_queries, search_queries(entity_queries, refresh=refresh)):
+            if isinstance(search_results, Exception):
+                logging.error(f"Error for entity '{entity}': {search_results}")
+                st.error(f"Error for entity '{entity}': {search_results}")
+
+            # Check if search results are valid and structured correctly
+            elif isinstance(search_results, list) and all(isinstance(result, dict) for result in search_results):
+                # Structure results for parsing
+                collected_results[entity] = [
+                    {
+                        "entity": entity,
+                        "title": result.get("title", "N/A"),
+                        "link": result.get("link", "N/A"),
+                        "snippet": result.get("snippet", "N/A")
+                    }
+                    for result in search_results
+                ]
+            else:
+                st.write(f"No valid results found for {entity}.")
+                logging.warning(f"Unexpected search results format for entity '{entity}': {search_results}")
+
+        # Parse all collected results with a single batched LLM pass
+        if collected_results:
+            entities = [entity for entity, _ in entity_queries if entity in collected_results]
+            parsed_outputs = parse_results_batch([collected_results[entity] for entity in entities])
+            results_storage.update(zip(entities, parsed_outputs))
 
         # Store parsed results in session state
         st.session_state["parsed_results"] = results_storage
@@ -158,19 +201,18 @@ def display_and_store_results():
     if "parsed_results" in st.session_state and st.session_state["parsed_results"]:
         parsed_data = st.session_state["parsed_results"]
         
-        # Convert parsed results to a DataFrame for display and download
-        results_df = pd.DataFrame([
-            {"Entity": entity, "Extracted Info": info}
-            for entity, info in parsed_data.items()
-        ])
+        # Convert parsed results to a DataFrame for display
+        results_df = pd.DataFrame.from_records(list(parsed_data.items()), columns=["Entity", "Extracted Info"])
 
         # Display results in a table format
         st.write("Parsed Data:")
         st.dataframe(results_df)
 
-        # Provide download option as CSV
+        # Provide download option as CSV, written straight from the parsed results
         csv_buffer = io.StringIO()
-        results_df.to_csv(csv_buffer, index=False)
+        csv_writer = csv.writer(csv_buffer, lineterminator="\n")
+        csv_writer.writerow(["Entity", "Extracted Info"])
+        csv_writer.writerows(parsed_data.items())
         st.download_button(
             label="Download CSV",
             data=csv_buffer.getvalue(),
@@ -182,30 +224,65 @@ def display_and_store_results():
         if st.session_state.get("data_source") == "Google Sheets":
             if st.button("Update Google Sheet"):
                 try:
-                    credentials = Credentials.from_service_account_info(st.secrets["gcp_service_account"])
-                    client = gspread.authorize(credentials)
-                    sheet = client.open_by_url(st.session_state.get("sheet_url"))
+                    sheet = get_gspread_client().open_by_url(st.session_state.get("sheet_url"))
                     worksheet = sheet.get_worksheet(0)
-                    worksheet.update([results_df.columns.values.tolist()] + results_df.values.tolist())
+                    # Send all rows in a single values.update request
+                    body = [results_df.columns.tolist()] + results_df.astype(str).values.tolist()
+                    sheet.values_update(
+                        absolute_range_name(worksheet.title, "A1"),
+                        params={"valueInputOption": "RAW"},
+                        body={"values": body}
+                    )
+                    # Reload the sheet on the next rerun instead of serving the cached copy
+                    fetch_google_sheet.clear()
                     st.success("Google Sheet updated successfully!")
                 except Exception as e:
                     st.error(f"Failed to update Google Sheet: {e}")
     else:
         st.warning("No extracted data available to display.")
 
+# Function to render a histogram figure with a KDE curve, cached on the column values
+@st.cache_data
+def build_histogram_figure(values):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.histplot(values, kde=True, ax=ax)
+    plt.close(fig)
+    return fig
+
 # Function for histogram display
 def display_histogram(data):
     st.header("Histogram")
     numeric_columns = data.select_dtypes(include='number').columns
     if not numeric_columns.empty:
         hist_field = st.selectbox("Select a field for histogram:", numeric_columns)
-        if hist_field:
-            plt.figure(figsize=(10, 5))
-            sns.histplot(data[hist_field], kde=True)
-            st.pyplot(plt)
+        show_kde = st.checkbox("Show density curve (slower)")
+        if hist_field and show_kde:
+            st.pyplot(build_histogram_figure(data[hist_field]))
+        elif hist_field:
+            counts, edges = np.histogram(data[hist_field].dropna().to_numpy(dtype=float), bins="auto")
+            st.bar_chart(pd.DataFrame({"count": counts}, index=edges[:-1]))
     else:
         st.info("No numeric columns available for histogram.")
 
+# Function to apply a filter to the data, cached on the data and filter settings
+@st.cache_data
+def filter_dataframe(data, filter_field, filter_type, values):
+    if filter_type == "Range":
+        min_val, max_val = values
+        return data[(data[filter_field] >= min_val) & (data[filter_field] <= max_val)]
+    elif filter_type == "Greater than or equal to":
+        return data[data[filter_field] >= values[0]]
+    elif filter_type == "Less than or equal to":
+        return data[data[filter_field] <= values[0]]
+    elif filter_type == "Equal to":
+        return data[data[filter_field] == values[0]]
+    elif filter_type == "Values":
+        return data[data[filter_field].isin(values)]
+    return data
+
 # Function for filtering data
 def data_filtering(data):
     st.header("Data Filtering Options")
@@ -218,21 +295,21 @@ def data_filtering(data):
                                              min_value=float(data[filter_field].min()), 
                                              max_value=float(data[filter_field].max()), 
                                              value=(float(data[filter_field].min()), float(data[filter_field].max())))
-                data = data[(data[filter_field] >= min_val) & (data[filter_field] <= max_val)]
+                data = filter_dataframe(data, filter_field, filter_type, (min_val, max_val))
             elif filter_type == "Greater than or equal to":
                 min_val = st.number_input("Minimum value:", value=float(data[filter_field].min()))
-                data = data[data[filter_field] >= min_val]
+                data = filter_dataframe(data, filter_field, filter_type, (min_val,))
             elif filter_type == "Less than or equal to":
                 max_val = st.number_input("Maximum value:", value=float(data[filter_field].max()))
-                data = data[data[filter_field] <= max_val]
+                data = filter_dataframe(data, filter_field, filter_type, (max_val,))
             elif filter_type == "Equal to":
                 value = st.number_input("Value to equal:", value=float(data[filter_field].min()))
-                data = data[data[filter_field] == value]
+                data = filter_dataframe(data, filter_field, filter_type, (value,))
         else:
             unique_values = data[filter_field].unique()
             selected_values = st.multiselect("Select values:", unique_values)
             if selected_values:
-                data = data[data[filter_field].isin(selected_values)]
+                data = filter_dataframe(data, filter_field, "Values", tuple(selected_values))
     st.write("Filtered Data")
     st.dataframe(data)
     return data